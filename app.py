@@ -4,10 +4,14 @@ Main application file for PetroRAG
 import os
 from flask import Flask, render_template, send_from_directory
 import pandas as pd
-from app.config.config import DATA_DIR, EMBEDDINGS_FILE, PORT, HOST, DEBUG, SECRET_KEY
+from app.config.config import (
+    DATA_DIR, EMBEDDINGS_FILE, PORT, HOST, DEBUG, SECRET_KEY, USE_EMBEDDING_CACHE, OPENAI_BASE_URL
+)
 from app.core.document_processor import DocumentProcessor
+from app.core.embedding_cache import EmbeddingCache
 from app.core.embedding_manager import EmbeddingManager
 from app.api.routes import api_bp, init_rag_engine
+from app.utils.text_processing import vector_similarity
 from app.logging.logger import setup_logger
 
 # Create Flask application
@@ -50,20 +54,98 @@ def initialize_data():
     app.logger.info(f'Processed {len(document_df)} document segments')
     
     # Create or load embeddings
-    embedding_manager = EmbeddingManager()
-    
-    if os.path.exists(EMBEDDINGS_FILE):
+    if USE_EMBEDDING_CACHE and len(document_df) > 0:
+        embeddings = compute_cached_embeddings(document_df)
+    elif os.path.exists(EMBEDDINGS_FILE):
+        embedding_manager = EmbeddingManager()
         app.logger.info('Loading existing embeddings...')
         embeddings = embedding_manager.load_embeddings()
     else:
+        embedding_manager = EmbeddingManager()
         app.logger.info('Creating new embeddings...')
         embeddings = embedding_manager.compute_embeddings(document_df)
-        embedding_manager.save_embeddings(embeddings)
+        save_index_embeddings(embedding_manager, embeddings)
     
     # Initialize RAG engine
     init_rag_engine(document_df, embeddings)
     app.logger.info('RAG engine initialized')
 
+def compute_cached_embeddings(document_df):
+    """
+    Compute embeddings through the content-addressed cache.
+    
+    Only segments whose text has not been embedded before are sent to the API.
+    
+    Args:
+        document_df (pd.DataFrame): DataFrame containing document segments
+        
+    Returns:
+        dict: Dictionary mapping indices to embeddings
+    """
+    cache = EmbeddingCache()
+    embedding_manager = EmbeddingManager(cache=cache)
+    
+    # Carry over the index saved before the cache existed, if it still matches
+    if len(cache) == 0 and not OPENAI_BASE_URL and os.path.exists(EMBEDDINGS_FILE):
+        seed_cache_from_index(cache, embedding_manager, document_df)
+    
+    app.logger.info('Computing embeddings with cache...')
+    embeddings = embedding_manager.compute_embeddings(document_df)
+    save_index_embeddings(embedding_manager, embeddings)
+    
+    stats = cache.get_stats()
+    app.logger.info(
+        f"Embedding cache: {stats['entries']} entries, {stats['hits']} hits, "
+        f"{stats['misses']} misses ({stats['hit_rate']:.1%} hit rate)"
+    )
+    return embeddings
+
+def seed_cache_from_index(cache, embedding_manager, document_df, sample_size=3, min_similarity=0.99):
+    """
+    Seed an empty cache from EMBEDDINGS_FILE when it matches the rebuilt segments.
+    
+    The saved index is keyed by row index and does not record the text behind
+    each vector, so it is only trusted if it covers exactly the current rows and
+    a few sampled rows re-embed to the same vectors.
+    
+    Args:
+        cache (EmbeddingCache): The empty cache to fill
+        embedding_manager (EmbeddingManager): Manager used to load and re-embed
+        document_df (pd.DataFrame): The rebuilt document segments
+        sample_size (int, optional): Rows re-embedded to verify the saved vectors
+        min_similarity (float, optional): Similarity a sampled row must reach
+    """
+    saved = embedding_manager.load_embeddings()
+    if not saved or set(saved) != set(document_df.index):
+        app.logger.warning(f'{EMBEDDINGS_FILE} does not match the current segments; not seeding the embedding cache')
+        return
+    
+    sample = document_df.sample(n=min(sample_size, len(document_df)), random_state=0)
+    for idx, row in sample.iterrows():
+        if vector_similarity(embedding_manager.get_embedding(row.Text), saved[idx]) < min_similarity:
+            app.logger.warning(f'{EMBEDDINGS_FILE} was built from different segment text; not seeding the embedding cache')
+            return
+    
+    added = cache.seed(document_df, saved, embedding_manager.model)
+    cache.save()
+    app.logger.info(f'Seeded embedding cache with {added} embeddings from {EMBEDDINGS_FILE}')
+
+def save_index_embeddings(embedding_manager, embeddings):
+    """
+    Save embeddings to EMBEDDINGS_FILE unless they came from a non-default endpoint.
+    
+    With OPENAI_BASE_URL pointing at a stand-in such as the load-test mock, the
+    vectors are not real and must not replace the saved index.
+    
+    Args:
+        embedding_manager (EmbeddingManager): Manager used to save the embeddings
+        embeddings (dict): Dictionary mapping indices to embeddings
+    """
+    if OPENAI_BASE_URL:
+        app.logger.info(f'Not saving embeddings from {OPENAI_BASE_URL} over {EMBEDDINGS_FILE}')
+        return
+    embedding_manager.save_embeddings(embeddings)
+
 if __name__ == '__main__':
     # Initialize data
     initialize_data()
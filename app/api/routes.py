@@ -1,10 +1,18 @@
 """
 API routes for the PetroRAG application
 """
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, g, request, jsonify, session
+import hmac
+import random
+import threading
 import uuid
 from app.core.rag_engine import RAGEngine
-from app.config.config import USE_MEMORY
+from app.core.resilience import Deadline, DeadlineExceeded
+from app.core.shard_index import ShardsUnavailable
+from app.utils.profiler import SamplingProfiler
+from app.config.config import (
+    USE_MEMORY, REQUEST_DEADLINE, PROFILE_SAMPLE_RATE, PROFILE_INTERVAL, PROFILE_ADMIN_TOKEN
+)
 
 # Create a blueprint for the API
 api_bp = Blueprint('api', __name__)
@@ -12,6 +20,55 @@ api_bp = Blueprint('api', __name__)
 # Global RAG engine instance
 rag_engine = None
 
+# Request profiler and the number of upcoming queries an admin asked to profile
+profiler = SamplingProfiler(interval=PROFILE_INTERVAL)
+profile_armed = 0
+profile_lock = threading.Lock()
+
+# Profiles can only be downloaded with the admin token, so don't record any without it
+profile_sample_rate = PROFILE_SAMPLE_RATE if PROFILE_ADMIN_TOKEN else 0.0
+if PROFILE_SAMPLE_RATE > 0 and not PROFILE_ADMIN_TOKEN:
+    print("Warning: PROFILE_SAMPLE_RATE is ignored because PROFILE_ADMIN_TOKEN is not set")
+
+def _is_admin():
+    """Check the admin token; admin access is disabled when no token is configured"""
+    if not PROFILE_ADMIN_TOKEN:
+        return False
+    token = request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(token.encode('utf-8'), PROFILE_ADMIN_TOKEN.encode('utf-8'))
+
+def _should_profile():
+    """Decide whether the current /api/query request is profiled"""
+    global profile_armed
+    if request.headers.get('X-Profile') == '1' and _is_admin():
+        return True
+    if profile_armed:
+        with profile_lock:
+            if profile_armed > 0:
+                profile_armed -= 1
+                return True
+    return profile_sample_rate > 0 and random.random() < profile_sample_rate
+
+@api_bp.before_request
+def start_profile():
+    """Start sampling the request thread for selected queries"""
+    if request.endpoint == 'api.query' and _should_profile():
+        g.profile_id = profiler.start(label=request.path)
+
+@api_bp.after_request
+def stop_profile(response):
+    """Finish the request profile and tell the client where to find it"""
+    if g.get('profile_id'):
+        profiler.stop()
+        response.headers['X-Profile-Id'] = g.profile_id
+    return response
+
+@api_bp.teardown_request
+def discard_profile(exc):
+    """Make sure a failed request does not leave its thread registered"""
+    if g.get('profile_id'):
+        profiler.stop()
+
 @api_bp.route('/query', methods=['POST'])
 def query():
     """
@@ -39,13 +96,17 @@ def query():
     
     # Generate answer (stateless mode only)
     try:
-        answer = rag_engine.answer_query(query)
+        answer = rag_engine.answer_query(query, deadline=Deadline(REQUEST_DEADLINE))
         
         response = {
             "answer": answer
         }
             
         return jsonify(response)
+    except DeadlineExceeded as e:
+        return jsonify({"error": str(e)}), 504
+    except ShardsUnavailable as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -60,6 +121,100 @@ def clear_memory():
     """
     return jsonify({"success": True, "message": "Memory functionality is disabled"}), 200
 
+@api_bp.route('/stats', methods=['GET'])
+def stats():
+    """
+    Endpoint for runtime statistics of the RAG engine.
+    
+    Returns:
+        JSON response with engine statistics
+    """
+    global rag_engine
+    if rag_engine is None:
+        return jsonify({"error": "RAG engine not initialized"}), 500
+    
+    stats = rag_engine.get_stats()
+    stats["profiler"] = profiler.get_stats()
+    return jsonify(stats)
+
+@api_bp.route('/admin/profile', methods=['GET'])
+def download_profile():
+    """
+    Endpoint for downloading request profiles in collapsed-stack format.
+    
+    Query parameters:
+        id (optional): A single request profile, as returned in X-Profile-Id.
+            All profiles are aggregated when omitted.
+    
+    Returns:
+        Collapsed stacks as a text attachment, ready for flamegraph.pl or speedscope
+    """
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    
+    profile_id = request.args.get('id')
+    collapsed = profiler.collapsed(profile_id)
+    if collapsed is None:
+        return jsonify({"error": f"Profile {profile_id} not found"}), 404
+    
+    filename = f"profile-{profile_id or 'aggregate'}.collapsed"
+    return Response(collapsed, mimetype='text/plain',
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+@api_bp.route('/admin/profile/requests', methods=['GET'])
+def list_profiles():
+    """
+    Endpoint for listing recent request profiles.
+    
+    Returns:
+        JSON response with profiler counters and recent profile summaries
+    """
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    
+    return jsonify({"stats": profiler.get_stats(), "profiles": profiler.list_recent()})
+
+@api_bp.route('/admin/profile/arm', methods=['POST'])
+def arm_profile():
+    """
+    Endpoint for profiling the next queries on demand.
+    
+    Request body:
+        {
+            "requests": 10
+        }
+    
+    Returns:
+        JSON response with the number of queries that will be profiled
+    """
+    global profile_armed
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        count = int(data.get('requests', 1))
+    except (TypeError, ValueError):
+        return jsonify({"error": "requests must be an integer"}), 400
+    
+    with profile_lock:
+        profile_armed = max(0, count)
+    return jsonify({"armed": profile_armed})
+
+@api_bp.route('/admin/profile/reset', methods=['POST'])
+def reset_profile():
+    """
+    Endpoint for discarding recorded profiles.
+    
+    Returns:
+        JSON response with success status
+    """
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    
+    profiler.reset()
+    return jsonify({"success": True})
+
 def init_rag_engine(document_df, embeddings):
     """
     Initialize the global RAG engine.
@@ -69,4 +224,6 @@ def init_rag_engine(document_df, embeddings):
         embeddings (dict): Dictionary mapping indices to embeddings
     """
     global rag_engine
+    if rag_engine is not None:
+        rag_engine.close()
     rag_engine = RAGEngine(document_df, embeddings) 
\ No newline at end of file
@@ -11,6 +11,16 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # Point at a local stand-in (e.g. the load-test mock)
+FALLBACK_LLM_MODEL = os.getenv("FALLBACK_LLM_MODEL", "gpt-4o-mini")  # Faster model used when time runs short
+
+# OpenAI call resilience settings
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", 30.0))  # Total time budget for one query in seconds
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 20.0))  # Upper bound for a single OpenAI call attempt
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))  # Retries with jittered backoff after the first attempt
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "True").lower() == "true"  # Duplicate calls that exceed the recent p95
+DEGRADE_BUDGET = float(os.getenv("DEGRADE_BUDGET", 10.0))  # Below this many seconds left, degrade the LLM call
+DEGRADED_CONTEXT_SECTIONS = int(os.getenv("DEGRADED_CONTEXT_SECTIONS", 2))  # Context sections used when degraded
 
 # Application settings
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
@@ -20,8 +30,24 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 
 # Data processing settings
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 10))  # Number of sentences per chunk
+USE_EMBEDDING_CACHE = os.getenv("USE_EMBEDDING_CACHE", "True").lower() == "true"  # Reuse embeddings of unchanged chunk text
 MAX_CONTEXT_SECTIONS = int(os.getenv("MAX_CONTEXT_SECTIONS", 5))  # Number of sections to include in context
 
+# Retrieval settings
+NUM_SHARDS = int(os.getenv("NUM_SHARDS", 1))  # Index shards served by worker processes (1 = in-process search)
+SHARD_TIMEOUT = float(os.getenv("SHARD_TIMEOUT", 2.0))  # Seconds to wait for shards before using partial results
+
+# Relevance gate settings
+RELEVANCE_GATE = os.getenv("RELEVANCE_GATE", "True").lower() == "true"  # Skip the LLM when nothing relevant is found
+RELEVANCE_GATE_QUANTILE = float(os.getenv("RELEVANCE_GATE_QUANTILE", 0.05))  # Quantile of segment-pair similarity used as the floor
+RELEVANCE_MIN_SCORE = float(os.getenv("RELEVANCE_MIN_SCORE")) if os.getenv("RELEVANCE_MIN_SCORE") else None  # Fixed floor overriding calibration
+RELEVANCE_DOMINANCE_GAP = float(os.getenv("RELEVANCE_DOMINANCE_GAP", 1.0))  # Score gap (in std devs) that trims top-k
+
+# Profiling settings
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))  # Fraction of /api/query requests to profile
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.005))  # Seconds between stack samples
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")  # Required in X-Admin-Token for profiling endpoints; they are disabled when unset
+
 # Chat memory settings
 MAX_HISTORY = int(os.getenv("MAX_HISTORY", 10))  # Maximum number of exchanges to keep in history
 MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", 1000))  # Maximum tokens to use for memory context
@@ -29,4 +55,5 @@ USE_MEMORY = False  # Disable memory functionality
 
 # Paths
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
-EMBEDDINGS_FILE = os.path.join(DATA_DIR, "embeddings.pkl") 
\ No newline at end of file
+EMBEDDINGS_FILE = os.path.join(DATA_DIR, "embeddings.pkl")
+EMBEDDING_CACHE_FILE = os.path.join(DATA_DIR, "embedding_cache.pkl") 
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Content-addressed cache of chunk embeddings.
+
+Vectors are keyed by a hash of the normalized chunk text, the embedding model
+and the API endpoint that produced them, so they survive row renumbering and
+re-chunking: only text that has never been embedded with the current model
+costs an API call. Keying on the endpoint keeps vectors from a stand-in server
+(such as the load-test mock) from ever being served as real ones.
+"""
+import hashlib
+import os
+import pickle
+
+from app.config.config import EMBEDDING_CACHE_FILE, OPENAI_BASE_URL
+from app.utils.text_processing import normalize_chunk_text
+
+
+class EmbeddingCache:
+    """Persistent mapping from hash(endpoint, model, normalized text) to embedding"""
+
+    def __init__(self, file_path=EMBEDDING_CACHE_FILE, endpoint=OPENAI_BASE_URL):
+        """
+        Initialize the cache, loading any existing entries from disk.
+
+        Args:
+            file_path (str): Path of the cache file
+            endpoint (str, optional): API base URL the embeddings come from; None
+                for the default OpenAI endpoint
+        """
+        self.file_path = file_path
+        self.endpoint = endpoint or ""
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def make_key(self, text, model):
+        """
+        Build the cache key for a chunk of text.
+
+        Args:
+            text (str): The chunk text
+            model (str): The embedding model name
+
+        Returns:
+            str: Hex digest identifying the (endpoint, model, text) triple
+        """
+        payload = f"{self.endpoint}\n{model}\n{normalize_chunk_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, text, model):
+        """
+        Look up the embedding for a chunk of text.
+
+        Args:
+            text (str): The chunk text
+            model (str): The embedding model name
+
+        Returns:
+            list: The cached embedding, or None on a miss
+        """
+        embedding = self.entries.get(self.make_key(text, model))
+        if embedding is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return embedding
+
+    def contains(self, text, model):
+        """
+        Check whether a chunk of text is cached, without counting a hit or miss.
+
+        Args:
+            text (str): The chunk text
+            model (str): The embedding model name
+
+        Returns:
+            bool: True if an embedding is cached for the text
+        """
+        return self.make_key(text, model) in self.entries
+
+    def put(self, text, model, embedding):
+        """
+        Store the embedding for a chunk of text.
+
+        Args:
+            text (str): The chunk text
+            model (str): The embedding model name
+            embedding (list): The embedding vector
+        """
+        self.entries[self.make_key(text, model)] = embedding
+
+    def seed(self, document_df, embeddings, model):
+        """
+        Add embeddings keyed by row index, using the text of the same rows.
+
+        The caller must have checked that the embeddings belong to these rows.
+
+        Args:
+            document_df (pd.DataFrame): DataFrame containing document segments
+            embeddings (dict): Dictionary mapping indices to embeddings
+            model (str): The embedding model that produced them
+
+        Returns:
+            int: Number of entries added
+        """
+        added = 0
+        for idx, row in document_df.iterrows():
+            if idx in embeddings and not self.contains(row.Text, model):
+                self.put(row.Text, model, embeddings[idx])
+                added += 1
+        return added
+
+    def load(self):
+        """Load cache entries from disk if the cache file exists"""
+        if os.path.exists(self.file_path):
+            with open(self.file_path, 'rb') as f:
+                self.entries = pickle.load(f)
+
+    def save(self):
+        """Save cache entries to disk"""
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        with open(self.file_path, 'wb') as f:
+            pickle.dump(self.entries, f)
+
+    def get_stats(self):
+        """
+        Get cache size and hit rate.
+
+        Returns:
+            dict: Entry count, hits, misses and hit rate since the cache was loaded
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self.entries)
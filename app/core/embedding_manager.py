@@ -6,46 +6,95 @@ import pickle
 import pandas as pd
 import numpy as np
 from openai import OpenAI
-from app.config.config import OPENAI_API_KEY, EMBEDDING_MODEL, EMBEDDINGS_FILE
+from app.config.config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, EMBEDDING_MODEL, EMBEDDINGS_FILE,
+    OPENAI_TIMEOUT, OPENAI_MAX_RETRIES, HEDGE_REQUESTS
+)
+from app.core.resilience import ResilientCaller
 
 class EmbeddingManager:
     """Class for creating and managing document embeddings"""
     
-    def __init__(self):
-        """Initialize the embedding manager"""
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+    def __init__(self, cache=None):
+        """
+        Initialize the embedding manager.
+        
+        Args:
+            cache (EmbeddingCache, optional): Content-addressed cache used by compute_embeddings
+        """
+        # Retries are handled by the resilient caller, not the client
+        self.client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
         self.model = EMBEDDING_MODEL
+        self.cache = cache
+        self.caller = ResilientCaller(
+            "embeddings",
+            timeout=OPENAI_TIMEOUT,
+            max_retries=OPENAI_MAX_RETRIES,
+            hedge=HEDGE_REQUESTS
+        )
         
-    def get_embedding(self, text):
+    def get_embedding(self, text, deadline=None):
         """
         Get an embedding for a given text.
         
         Args:
             text (str): The text to embed
+            deadline (Deadline, optional): Deadline of the request this call belongs to
             
         Returns:
             list: The embedding vector
         """
-        response = self.client.embeddings.create(
-            model=self.model,
-            input=text
-        )
+        def create(timeout):
+            return self.client.with_options(timeout=timeout).embeddings.create(
+                model=self.model,
+                input=text
+            )
+        
+        response = self.caller.call(create, deadline)
         return response.data[0].embedding
     
-    def compute_embeddings(self, df):
+    def compute_embeddings(self, df, save_every=50):
         """
         Compute embeddings for all documents in the DataFrame.
         
+        When a cache is configured, segments whose text was embedded before
+        with the same model are reused instead of sent to the API. New
+        embeddings are saved to the cache every ``save_every`` API calls and
+        when the loop stops, so a failure partway through keeps what was paid for.
+        
         Args:
             df (pd.DataFrame): DataFrame containing document segments
+            save_every (int, optional): API calls between cache saves
             
         Returns:
             dict: Dictionary mapping indices to embeddings
         """
+        if self.cache is None:
+            pending = len(df)
+        else:
+            pending = sum(1 for text in df.Text if not self.cache.contains(text, self.model))
+        if pending:
+            print(f"Warning: {pending}/{len(df)} segments need embedding, about {pending} API calls")
+        
         embeddings = {}
-        for idx, row in df.iterrows():
-            print(f"Creating embedding for document {idx + 1}/{len(df)}...")
-            embeddings[idx] = self.get_embedding(row.Text)
+        created = 0
+        try:
+            for idx, row in df.iterrows():
+                if self.cache is not None:
+                    cached = self.cache.get(row.Text, self.model)
+                    if cached is not None:
+                        embeddings[idx] = cached
+                        continue
+                print(f"Creating embedding for document {idx + 1}/{len(df)}...")
+                embeddings[idx] = self.get_embedding(row.Text)
+                created += 1
+                if self.cache is not None:
+                    self.cache.put(row.Text, self.model, embeddings[idx])
+                    if created % save_every == 0:
+                        self.cache.save()
+        finally:
+            if self.cache is not None and created:
+                self.cache.save()
         return embeddings
     
     def save_embeddings(self, embeddings, file_path=EMBEDDINGS_FILE):
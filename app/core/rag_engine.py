@@ -1,6 +1,7 @@
 """
 RAG (Retrieval Augmented Generation) engine for the PetroRAG application
 """
+import threading
 import pandas as pd
 import numpy as np
 from openai import OpenAI
@@ -8,8 +9,16 @@ from langchain.chains import ConversationChain
 from langchain.memory import ConversationBufferMemory
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from app.config.config import OPENAI_API_KEY, LLM_MODEL, MAX_CONTEXT_SECTIONS, USE_MEMORY, MEMORY_MAX_TOKENS
+from app.config.config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, LLM_MODEL, MAX_CONTEXT_SECTIONS, USE_MEMORY, MEMORY_MAX_TOKENS,
+    NUM_SHARDS, SHARD_TIMEOUT, RELEVANCE_GATE, RELEVANCE_GATE_QUANTILE, RELEVANCE_MIN_SCORE,
+    RELEVANCE_DOMINANCE_GAP, FALLBACK_LLM_MODEL, OPENAI_TIMEOUT, OPENAI_MAX_RETRIES, HEDGE_REQUESTS,
+    DEGRADE_BUDGET, DEGRADED_CONTEXT_SECTIONS
+)
 from app.core.embedding_manager import EmbeddingManager
+from app.core.relevance_gate import RelevanceGate
+from app.core.resilience import Deadline, DeadlineExceeded, ResilientCaller
+from app.core.shard_index import ShardedIndex, ShardsUnavailable
 from app.utils.text_processing import vector_similarity
 
 class RAGEngine:
@@ -23,13 +32,47 @@ class RAGEngine:
             document_df (pd.DataFrame, optional): DataFrame containing document segments
             embeddings (dict, optional): Dictionary mapping indices to embeddings
         """
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        # Retries are handled by the resilient callers, not the client
+        self.client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
+        # One caller per chat model, so each tracks its own latency for hedging
+        self.completion_callers = {
+            model: ResilientCaller(
+                f"completions:{model}",
+                timeout=OPENAI_TIMEOUT,
+                max_retries=OPENAI_MAX_RETRIES,
+                hedge=HEDGE_REQUESTS
+            )
+            for model in {LLM_MODEL, FALLBACK_LLM_MODEL} if model
+        }
+        self.degradation_stats = {"reduced_context": 0, "fallback_model": 0, "fallback_after_error": 0}
+        self._stats_lock = threading.Lock()
         self.embedding_manager = EmbeddingManager()
         self.document_df = document_df
         self.embeddings = embeddings
         
+        # Partition the index across worker processes when sharding is enabled
+        self.sharded_index = None
+        if embeddings and NUM_SHARDS > 1:
+            self.sharded_index = ShardedIndex(embeddings, document_df, NUM_SHARDS, SHARD_TIMEOUT)
+            # The shard workers own the vectors; don't keep a second copy here
+            self.embeddings = None
+        
+        # Calibrate the relevance gate against this index
+        self.relevance_gate = None
+        if embeddings and RELEVANCE_GATE:
+            scores = None
+            if self.sharded_index is not None:
+                scores = self.sharded_index.sample_pairwise_scores()
+            self.relevance_gate = RelevanceGate(
+                self.embeddings,
+                quantile=RELEVANCE_GATE_QUANTILE,
+                min_score=RELEVANCE_MIN_SCORE,
+                dominance_gap=RELEVANCE_DOMINANCE_GAP,
+                scores=scores
+            )
+        
         # Initialize LangChain components
-        self.llm = ChatOpenAI(api_key=OPENAI_API_KEY, model_name=LLM_MODEL)
+        self.llm = ChatOpenAI(api_key=OPENAI_API_KEY, model_name=LLM_MODEL, base_url=OPENAI_BASE_URL)
         
         # Dictionary to store conversation chains by session ID
         self.conversations = {}
@@ -83,19 +126,32 @@ class RAGEngine:
         
         return self.conversations[session_id]
     
-    def find_relevant_documents(self, query, top_n=MAX_CONTEXT_SECTIONS):
+    def find_relevant_documents(self, query, top_n=MAX_CONTEXT_SECTIONS, deadline=None):
         """
         Find the most relevant document sections for a query.
         
         Args:
             query (str): The query to find relevant documents for
             top_n (int, optional): Number of top documents to return
+            deadline (Deadline, optional): Deadline of the request
             
         Returns:
             list: List of (similarity_score, document_index) tuples
         """
+        deadline = deadline or Deadline()
+        
         # Get query embedding
-        query_embedding = self.embedding_manager.get_embedding(query)
+        query_embedding = self.embedding_manager.get_embedding(query, deadline)
+        
+        # Fan out to the shard workers and merge their top results
+        if self.sharded_index is not None:
+            timeout = min(SHARD_TIMEOUT, deadline.remaining())
+            try:
+                return self.sharded_index.search(query_embedding, top_n, timeout=timeout)
+            except ShardsUnavailable as e:
+                if deadline.expired():
+                    raise DeadlineExceeded("Deadline exceeded during sharded search") from e
+                raise
         
         # Calculate similarities
         document_similarities = sorted([
@@ -106,18 +162,19 @@ class RAGEngine:
         # Return top N results
         return document_similarities[:top_n]
     
-    def extract_context_sections(self, query):
+    def extract_context_sections(self, query, deadline=None):
         """
         Extract relevant context sections for a query.
         
         Args:
             query (str): The user's query
+            deadline (Deadline, optional): Deadline of the request
             
         Returns:
             str: Formatted context sections
         """
         # Find relevant documents
-        relevant_docs = self.find_relevant_documents(query)
+        relevant_docs = self.find_relevant_documents(query, deadline=deadline)
         
         # Extract the text of relevant documents
         context_sections = [
@@ -132,24 +189,25 @@ class RAGEngine:
         
         return formatted_context
     
-    def answer_query(self, query, session_id=None):
+    def answer_query(self, query, session_id=None, deadline=None):
         """
         Answer a query using the RAG pipeline.
         
         Args:
             query (str): The user's query
             session_id (str, optional): Session identifier for memory
+            deadline (Deadline, optional): Time budget for the whole query
             
         Returns:
             str: The generated answer
         """
         # If no session ID is provided or memory is disabled, use stateless mode
         if session_id is None or not USE_MEMORY:
-            return self._answer_query_stateless(query)
+            return self._answer_query_stateless(query, deadline)
         
         try:
             # Extract context
-            context = self.extract_context_sections(query)
+            context = self.extract_context_sections(query, deadline)
             
             # Get conversation chain for session
             conversation = self.get_conversation_chain(session_id)
@@ -165,18 +223,42 @@ class RAGEngine:
             print(error_msg)  # Print to console
             raise Exception(f"Memory processing error: {str(e)}")
     
-    def _answer_query_stateless(self, query):
+    def _answer_query_stateless(self, query, deadline=None):
         """
         Answer a query without using memory (stateless mode).
         
+        When the deadline leaves less than DEGRADE_BUDGET seconds for the LLM
+        call, fewer context sections are sent; with less than half of that the
+        faster fallback model is used as well.
+        
         Args:
             query (str): The user's query
+            deadline (Deadline, optional): Time budget for the whole query
             
         Returns:
             str: The generated answer
         """
+        deadline = deadline or Deadline()
+        
         # Find relevant documents
-        relevant_docs = self.find_relevant_documents(query)
+        relevant_docs = self.find_relevant_documents(query, deadline=deadline)
+        
+        # Answer immediately when nothing is relevant enough to be worth an LLM call.
+        # An empty result means retrieval had nothing to judge, not a miss.
+        if self.relevance_gate is not None and relevant_docs:
+            if not self.relevance_gate.passes(relevant_docs):
+                return self._no_answer_response(relevant_docs)
+            relevant_docs = self.relevance_gate.trim(relevant_docs)
+        
+        # Degrade instead of timing out when the budget is running short
+        model = LLM_MODEL
+        remaining = deadline.remaining()
+        if remaining < DEGRADE_BUDGET and len(relevant_docs) > DEGRADED_CONTEXT_SECTIONS:
+            relevant_docs = relevant_docs[:DEGRADED_CONTEXT_SECTIONS]
+            self._count_degradation("reduced_context")
+        if remaining < DEGRADE_BUDGET / 2 and FALLBACK_LLM_MODEL and FALLBACK_LLM_MODEL != LLM_MODEL:
+            model = FALLBACK_LLM_MODEL
+            self._count_degradation("fallback_model")
         
         # Extract the text of relevant documents
         context_sections = [
@@ -187,17 +269,73 @@ class RAGEngine:
         # Construct prompt
         prompt = self._construct_stateless_prompt(query, context_sections)
         
-        # Generate answer
-        completion = self.client.chat.completions.create(
-            model=LLM_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant specializing in petroleum engineering."},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        # Generate answer, retrying once on the fallback model if the primary fails
+        try:
+            return self._complete(prompt, model, deadline)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if model == FALLBACK_LLM_MODEL or not FALLBACK_LLM_MODEL or deadline.expired():
+                raise
+            print(f"LLM call to {model} failed ({e}), falling back to {FALLBACK_LLM_MODEL}")
+            self._count_degradation("fallback_after_error")
+            return self._complete(prompt, FALLBACK_LLM_MODEL, deadline)
+    
+    def _complete(self, prompt, model, deadline):
+        """
+        Run a chat completion through the resilient caller for a model.
         
+        Args:
+            prompt (str): The user prompt
+            model (str): The chat model to use
+            deadline (Deadline): Deadline of the request
+            
+        Returns:
+            str: The generated answer
+        """
+        def create(timeout):
+            return self.client.with_options(timeout=timeout).chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant specializing in petroleum engineering."},
+                    {"role": "user", "content": prompt}
+                ]
+            )
+        
+        completion = self.completion_callers[model].call(create, deadline)
         return completion.choices[0].message.content
     
+    def _count_degradation(self, key):
+        """Increment a degradation counter"""
+        with self._stats_lock:
+            self.degradation_stats[key] += 1
+    
+    def _no_answer_response(self, relevant_docs, max_sources=3):
+        """
+        Build the answer returned when the relevance gate rejects a query.
+        
+        Args:
+            relevant_docs (list): List of (similarity_score, document_index) tuples
+            max_sources (int, optional): Number of nearest sections to list
+            
+        Returns:
+            str: A "don't know" answer naming the nearest sources
+        """
+        answer = "I don't Know. None of the reports appear to cover this question."
+        
+        sources = []
+        for score, doc_idx in relevant_docs[:max_sources]:
+            if self.document_df is not None and doc_idx in self.document_df.index:
+                name = self.document_df.loc[doc_idx].Article_ID
+            else:
+                name = f"section {doc_idx}"
+            sources.append(f"{name} (similarity {score:.2f})")
+        
+        if sources:
+            answer += " Nearest sections: " + "; ".join(sources) + "."
+        
+        return answer
+    
     def _construct_stateless_prompt(self, query, context_sections):
         """
         Construct a prompt for stateless mode.
@@ -236,4 +374,33 @@ class RAGEngine:
         if session_id in self.conversations:
             self.conversations[session_id].memory.clear()
             # Optionally, remove the conversation chain completely
-            del self.conversations[session_id] 
\ No newline at end of file
+            del self.conversations[session_id]
+    
+    def get_stats(self):
+        """
+        Get runtime statistics for the engine.
+        
+        Returns:
+            dict: Statistics keyed by component
+        """
+        stats = {
+            "openai": {
+                "embeddings": self.embedding_manager.caller.get_stats(),
+                **{name: caller.get_stats() for name, caller in self.completion_callers.items()}
+            },
+            "degradation": dict(self.degradation_stats)
+        }
+        if self.sharded_index is not None:
+            stats["shards"] = self.sharded_index.get_stats()
+        if self.relevance_gate is not None:
+            stats["relevance_gate"] = self.relevance_gate.get_stats()
+        return stats
+    
+    def close(self):
+        """Release background resources such as shard worker processes and OpenAI call threads"""
+        self.embedding_manager.caller.close()
+        for caller in self.completion_callers.values():
+            caller.close()
+        if self.sharded_index is not None:
+            self.sharded_index.close()
+            self.sharded_index = None
@@ -0,0 +1,141 @@
+"""
+Relevance gate for skipping the LLM call when retrieval finds nothing useful.
+
+The gate is calibrated against the index it serves: it samples pairwise
+similarities between indexed segments and uses a low quantile of that
+distribution as the minimum acceptable top score. A query whose best match is
+weaker than what most unrelated segments of the same corpus share with each
+other is treated as out of scope. The spread of the same distribution is used
+to spot when a few sections clearly dominate the rest of the top-k.
+"""
+import threading
+
+import numpy as np
+
+
+class RelevanceGate:
+    """Decide whether retrieved sections are relevant enough to send to the LLM"""
+
+    def __init__(self, embeddings=None, quantile=0.05, min_score=None, dominance_gap=1.0,
+                 sample_size=256, seed=0, scores=None):
+        """
+        Initialize and calibrate the gate.
+
+        Args:
+            embeddings (dict, optional): Dictionary mapping indices to embeddings,
+                sampled for calibration when ``scores`` is not given
+            quantile (float): Quantile of pairwise segment similarity used as the score floor
+            min_score (float, optional): Fixed score floor that overrides the calibrated one
+            dominance_gap (float): Score gap, in standard deviations of the pairwise
+                similarity distribution, that marks the leading sections as dominant
+            sample_size (int): Maximum number of segments sampled for calibration
+            seed (int): Random seed for calibration sampling
+            scores (np.ndarray, optional): Pre-sampled pairwise similarities, e.g. from
+                ``ShardedIndex.sample_pairwise_scores`` when the vectors live in shard workers
+        """
+        self.quantile = quantile
+        self.dominance_gap = dominance_gap
+        self.stats = {"queries": 0, "llm_calls_saved": 0, "trimmed_queries": 0, "sections_trimmed": 0}
+        self._lock = threading.Lock()
+
+        if scores is None:
+            scores = self.sample_pairwise_scores(embeddings, sample_size, seed)
+        self.score_mean, self.score_std, calibrated = self._calibrate(scores, quantile)
+        self.threshold = calibrated if min_score is None else min_score
+
+    @staticmethod
+    def _calibrate(scores, quantile):
+        """Summarize sampled similarities as (mean, std, quantile floor)"""
+        if len(scores) == 0:
+            return 0.0, 0.0, None
+        return float(scores.mean()), float(scores.std()), float(np.quantile(scores, quantile))
+
+    @staticmethod
+    def sample_pairwise_scores(embeddings, sample_size=256, seed=0):
+        """
+        Sample similarities between segments of an in-process index.
+
+        Args:
+            embeddings (dict): Dictionary mapping indices to embeddings
+            sample_size (int): Maximum number of segments used as calibration queries
+            seed (int): Random seed for sampling
+
+        Returns:
+            np.ndarray: Flat array of pairwise similarity scores
+        """
+        if not embeddings or len(embeddings) < 2:
+            return np.zeros(0, dtype=np.float32)
+
+        matrix = np.array(list(embeddings.values()), dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        rows = rng.choice(len(matrix), size=min(sample_size, len(matrix)), replace=False)
+        columns = rng.choice(len(matrix), size=min(sample_size * 16, len(matrix)), replace=False)
+        scores = matrix[rows] @ matrix[columns].T
+        # Drop each sampled segment's similarity with itself
+        scores[rows[:, None] == columns[None, :]] = np.nan
+        return scores[~np.isnan(scores)]
+
+    def passes(self, relevant_docs):
+        """
+        Check whether the best retrieved section clears the relevance floor.
+
+        An empty result list is not judged (or counted) here: it means retrieval
+        failed, and only the caller can tell whether that is an error.
+
+        Args:
+            relevant_docs (list): List of (similarity_score, document_index) tuples, best first
+
+        Returns:
+            bool: True if the sections should be sent to the LLM
+        """
+        if not relevant_docs:
+            return True
+        passed = self.threshold is None or relevant_docs[0][0] >= self.threshold
+        with self._lock:
+            self.stats["queries"] += 1
+            if not passed:
+                self.stats["llm_calls_saved"] += 1
+        return passed
+
+    def trim(self, relevant_docs):
+        """
+        Drop trailing sections when the leading ones clearly dominate.
+
+        The cut is made at the largest gap between consecutive scores, provided
+        that gap is at least ``dominance_gap`` standard deviations wide.
+
+        Args:
+            relevant_docs (list): List of (similarity_score, document_index) tuples, best first
+
+        Returns:
+            list: The leading, dominant sections (or the input unchanged)
+        """
+        if len(relevant_docs) < 2 or self.score_std <= 0:
+            return relevant_docs
+
+        scores = [score for score, _ in relevant_docs]
+        gaps = [scores[i] - scores[i + 1] for i in range(len(scores) - 1)]
+        cut = max(range(len(gaps)), key=lambda i: gaps[i])
+        if gaps[cut] < self.dominance_gap * self.score_std:
+            return relevant_docs
+
+        kept = relevant_docs[:cut + 1]
+        with self._lock:
+            self.stats["trimmed_queries"] += 1
+            self.stats["sections_trimmed"] += len(relevant_docs) - len(kept)
+        return kept
+
+    def get_stats(self):
+        """
+        Get calibration values and gate counters.
+
+        Returns:
+            dict: Gate statistics
+        """
+        with self._lock:
+            return dict(
+                self.stats,
+                threshold=self.threshold,
+                score_mean=self.score_mean,
+                score_std=self.score_std,
+            )
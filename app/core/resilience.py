@@ -0,0 +1,316 @@
+"""
+Deadlines, retries and hedged requests for calls to the OpenAI API.
+
+A ``Deadline`` is created per API request and passed down through every stage
+so each call only waits for the time that is actually left. ``ResilientCaller``
+wraps a single kind of remote call: it retries transient failures with jittered
+exponential backoff and, once a call has been outstanding longer than the
+recent p95 latency, fires a duplicate request and takes whichever answers first.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from app.utils.profiler import inherit_profile
+
+# HTTP statuses worth retrying even though they are below 500
+RETRYABLE_STATUSES = {408, 409, 429}
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of time budget"""
+
+
+class Deadline:
+    """Absolute time budget for one request"""
+
+    def __init__(self, budget=None):
+        """
+        Initialize the deadline.
+
+        Args:
+            budget (float, optional): Seconds from now until the deadline. None means no deadline.
+        """
+        self.expires_at = None if budget is None else time.monotonic() + budget
+
+    def remaining(self):
+        """
+        Get the time left before the deadline.
+
+        Returns:
+            float: Seconds remaining (never negative), or infinity without a deadline
+        """
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        """Check whether the deadline has passed"""
+        return self.remaining() <= 0
+
+
+def is_retryable(error):
+    """
+    Decide whether a failed call is worth retrying.
+
+    Errors carrying an HTTP status (as OpenAI API errors do) are retried for
+    5xx responses and rate limiting; client errors such as a bad request are not.
+    Errors without a status (connection failures, timeouts) are retried.
+
+    Args:
+        error (Exception): The error raised by the call
+
+    Returns:
+        bool: True if the call may succeed on a retry
+    """
+    if isinstance(error, DeadlineExceeded):
+        return False
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return True
+    return status >= 500 or status in RETRYABLE_STATUSES
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies"""
+
+    def __init__(self, window=200, min_samples=20):
+        """
+        Initialize the tracker.
+
+        Args:
+            window (int): Number of recent latencies to keep
+            min_samples (int): Samples required before percentiles are reported
+        """
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        """Record a call latency in seconds"""
+        with self._lock:
+            self.samples.append(latency)
+
+    def percentile(self, pct):
+        """
+        Get a percentile of recent latencies.
+
+        Args:
+            pct (float): Percentile between 0 and 100
+
+        Returns:
+            float: The latency in seconds, or None until enough samples exist
+        """
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class _Attempt:
+    """One submitted call and the timeout it got when it actually started running"""
+
+    def __init__(self):
+        self.future = None
+        self.started = threading.Event()
+        self.started_at = None
+        self.timeout = None
+
+
+class ResilientCaller:
+    """Run a remote call with a timeout, jittered retries and hedging"""
+
+    def __init__(self, name, timeout=30.0, max_retries=2, backoff_base=0.25, backoff_max=4.0,
+                 hedge=True, hedge_min_delay=0.05, max_workers=32):
+        """
+        Initialize the caller.
+
+        Args:
+            name (str): Label used in statistics
+            timeout (float): Upper bound for a single attempt in seconds
+            max_retries (int): Retries after the first attempt
+            backoff_base (float): Base delay for exponential backoff in seconds
+            backoff_max (float): Cap on a single backoff delay in seconds
+            hedge (bool): Fire a duplicate request once an attempt exceeds the recent p95
+            hedge_min_delay (float): Never hedge sooner than this many seconds
+            max_workers (int): Threads available for in-flight attempts; hedges are
+                skipped while all of them are taken
+        """
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.max_workers = max_workers
+        self.latency = LatencyTracker()
+        self.stats = {
+            "calls": 0,
+            "failures": 0,
+            "retries": 0,
+            "hedges_fired": 0,
+            "hedges_skipped": 0,
+            "hedge_wins": 0,
+            "deadline_exceeded": 0,
+        }
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"openai-{name}")
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def call(self, fn, deadline=None):
+        """
+        Run ``fn`` within the deadline.
+
+        Args:
+            fn (callable): Function taking the per-attempt timeout in seconds and
+                returning the call result
+            deadline (Deadline, optional): Request deadline
+
+        Returns:
+            The result of ``fn``
+
+        Raises:
+            DeadlineExceeded: If the deadline passes, or leaves too little time
+                to retry, before a call succeeds
+            Exception: The last error from ``fn`` once retries are exhausted
+        """
+        deadline = deadline or Deadline()
+        self._count("calls")
+
+        attempt = 0
+        while True:
+            if deadline.expired():
+                self._count("deadline_exceeded")
+                raise DeadlineExceeded(f"{self.name}: deadline exceeded")
+
+            try:
+                return self._hedged_attempt(fn, deadline)
+            except Exception as e:
+                if deadline.expired():
+                    self._count("deadline_exceeded")
+                    raise DeadlineExceeded(f"{self.name}: deadline exceeded") from e
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self._count("failures")
+                    raise
+                # Full jitter keeps simultaneous retries from synchronizing
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if delay >= deadline.remaining():
+                    # Retries stop because the budget ran short, not because they ran out
+                    self._count("deadline_exceeded")
+                    raise DeadlineExceeded(f"{self.name}: deadline too short to retry") from e
+                attempt += 1
+                self._count("retries")
+                time.sleep(delay)
+
+    def _submit(self, fn, deadline, cap=float("inf")):
+        """Queue one call; its timeout is fixed when a worker thread picks it up"""
+        attempt = _Attempt()
+
+        def run():
+            attempt.timeout = min(self.timeout, deadline.remaining(), cap)
+            attempt.started_at = time.monotonic()
+            attempt.started.set()
+            if attempt.timeout <= 0:
+                raise DeadlineExceeded(f"{self.name}: deadline exceeded")
+            return fn(attempt.timeout)
+
+        with self._lock:
+            self._outstanding += 1
+        # A profiled request keeps sampling the worker thread that runs its call
+        attempt.future = self._executor.submit(inherit_profile(run))
+        attempt.future.add_done_callback(self._release)
+        return attempt
+
+    def _release(self, future):
+        with self._lock:
+            self._outstanding -= 1
+
+    def _saturated(self):
+        """Check whether every worker thread is already busy or spoken for"""
+        with self._lock:
+            return self._outstanding >= self.max_workers
+
+    def _first_success(self, attempts, end):
+        """
+        Wait until one attempt succeeds, all of them fail, or ``end`` passes.
+
+        Returns:
+            tuple: (winning attempt, result)
+        """
+        pending = {attempt.future: attempt for attempt in attempts}
+        error = None
+        while pending:
+            done, _ = wait(list(pending), timeout=max(0.0, end - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                attempt = pending.pop(future)
+                if future.exception() is None:
+                    return attempt, future.result()
+                error = future.exception()
+
+        if not pending:
+            raise error
+        # Calls that already started stop on their own client timeout
+        for future in pending:
+            future.cancel()
+        raise TimeoutError(f"{self.name}: attempt timed out")
+
+    def _hedged_attempt(self, fn, deadline):
+        """Run one attempt, duplicating it if it outlives the recent p95"""
+        primary = self._submit(fn, deadline)
+
+        # Waiting for a free worker counts against the request deadline only,
+        # not against the attempt timeout
+        remaining = deadline.remaining()
+        if not primary.started.wait(None if remaining == float("inf") else remaining):
+            primary.future.cancel()
+            raise DeadlineExceeded(f"{self.name}: deadline exceeded waiting for a worker")
+        end = primary.started_at + primary.timeout
+
+        hedge_after = self.latency.percentile(95) if self.hedge else None
+        if hedge_after is not None:
+            hedge_after = max(hedge_after, self.hedge_min_delay)
+
+        attempts = [primary]
+        if hedge_after is not None and primary.started_at + hedge_after < end:
+            done, _ = wait([primary.future], timeout=max(0.0, primary.started_at + hedge_after - time.monotonic()))
+            if not done:
+                if self._saturated():
+                    # A duplicate would only queue behind other requests
+                    self._count("hedges_skipped")
+                else:
+                    self._count("hedges_fired")
+                    attempts.append(self._submit(fn, deadline, cap=end - time.monotonic()))
+
+        winner, result = self._first_success(attempts, end)
+        if winner is not primary:
+            self._count("hedge_wins")
+        self.latency.record(time.monotonic() - winner.started_at)
+        return result
+
+    def close(self):
+        """Stop the worker threads; calls already running finish in the background"""
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self):
+        """
+        Get call counters and recent latency percentiles.
+
+        Returns:
+            dict: Caller statistics
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats["p50"] = self.latency.percentile(50)
+        stats["p95"] = self.latency.percentile(95)
+        return stats
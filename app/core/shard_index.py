@@ -0,0 +1,369 @@
+"""
+Sharded embedding index served by local worker processes.
+
+Embeddings are partitioned by a hash of their source document, so every
+segment of a report lands on the same shard. Each shard runs in its own
+process and answers top-k queries over its slice of the matrix; the
+coordinator fans a query out to all shards in parallel and merges the
+per-shard results, returning whatever arrived before the timeout.
+"""
+import hashlib
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, wait
+
+import numpy as np
+
+
+class ShardsUnavailable(Exception):
+    """Raised when no shard answered a search, so there are no results at all"""
+
+
+def shard_for_document(doc_name, num_shards):
+    """
+    Pick the shard for a document.
+
+    Args:
+        doc_name (str): Document identifier
+        num_shards (int): Total number of shards
+
+    Returns:
+        int: Shard number in [0, num_shards)
+    """
+    digest = hashlib.md5(str(doc_name).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % num_shards
+
+
+def _document_name(document_df, doc_index):
+    """Source document name for a segment, falling back to its row index"""
+    if document_df is not None and "Article_ID" in document_df.columns and doc_index in document_df.index:
+        # Article_IDs look like "<doc_name>_<sentence offset>"
+        return str(document_df.loc[doc_index].Article_ID).rsplit("_", 1)[0]
+    return str(doc_index)
+
+
+def top_k(matrix, indices, query_vector, top_n):
+    """
+    Score a query against an embedding matrix and return the best matches.
+
+    Args:
+        matrix (np.ndarray): Embeddings, one row per document segment
+        indices (list): Document index for each matrix row
+        query_vector (np.ndarray): The query embedding
+        top_n (int): Number of results to return
+
+    Returns:
+        list: List of (similarity_score, document_index) tuples, best first
+    """
+    if len(indices) == 0:
+        return []
+    scores = matrix @ query_vector
+    n = min(top_n, len(indices))
+    best = np.argpartition(-scores, n - 1)[:n]
+    best = best[np.argsort(-scores[best])]
+    return [(float(scores[i]), indices[i]) for i in best]
+
+
+def _sample_rows(rng, count, total):
+    """Pick up to ``count`` distinct row positions out of ``total``"""
+    return rng.choice(total, size=min(count, total), replace=False) if total else np.zeros(0, dtype=int)
+
+
+def _handle_request(op, args, indices, matrix):
+    """Run one coordinator request against this shard's slice of the index"""
+    if op == "search":
+        query_vector, top_n = args
+        return top_k(matrix, indices, query_vector, top_n)
+    if op == "sample":
+        # Random segment vectors used as calibration queries
+        count, seed = args
+        rows = _sample_rows(np.random.default_rng(seed), count, len(indices))
+        return [indices[i] for i in rows], matrix[rows]
+    if op == "score":
+        # Similarities between calibration queries and a sample of this shard
+        row_indices, row_vectors, count, seed = args
+        columns = _sample_rows(np.random.default_rng(seed), count, len(indices))
+        if len(columns) == 0 or len(row_indices) == 0:
+            return np.zeros(0, dtype=np.float32)
+        column_indices = np.array([indices[i] for i in columns], dtype=object)
+        scores = row_vectors @ matrix[columns].T
+        # Drop each calibration segment's similarity with itself
+        not_self = np.array(row_indices, dtype=object)[:, None] != column_indices[None, :]
+        return scores[not_self]
+    raise ValueError(f"Unknown shard request {op!r}")
+
+
+def _shard_worker(conn, indices, matrix):
+    """Worker process loop: answer (request_id, op, args) messages until None"""
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        request_id, op, args = message
+        try:
+            result = _handle_request(op, args, indices, matrix)
+        except Exception as e:
+            print(f"Shard request {op} failed: {e}")
+            result = None
+        conn.send((request_id, result))
+    conn.close()
+
+
+class ShardedIndex:
+    """Scatter-gather top-k search over embeddings partitioned across worker processes"""
+
+    def __init__(self, embeddings, document_df=None, num_shards=2, timeout=2.0, max_pending=8):
+        """
+        Initialize the sharded index and start one worker process per shard.
+
+        The coordinator keeps no copy of the vectors: each slice of the matrix
+        lives only in its worker process.
+
+        Args:
+            embeddings (dict): Dictionary mapping indices to embeddings
+            document_df (pd.DataFrame, optional): Document segments, used to shard by document
+            num_shards (int): Number of shards / worker processes
+            timeout (float): Seconds to wait for shard replies before returning partial results
+            max_pending (int): Unanswered requests a shard may have queued before it
+                is skipped, so a stalled worker cannot fill its pipe and block senders
+        """
+        self.num_shards = num_shards
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.stats = {"queries": 0, "partial_queries": 0, "shard_timeouts": 0, "shards_skipped": 0}
+        self.shard_sizes = [0] * num_shards
+
+        partitions = [([], []) for _ in range(num_shards)]
+        for doc_index, embedding in embeddings.items():
+            shard = shard_for_document(_document_name(document_df, doc_index), num_shards)
+            partitions[shard][0].append(doc_index)
+            partitions[shard][1].append(embedding)
+
+        # Replies are routed to waiting futures by request id, per shard
+        self._pending = [{} for _ in range(num_shards)]
+        self._in_flight = [0] * num_shards
+        self._down = [False] * num_shards
+        self._lock = threading.Lock()
+        self._send_locks = [threading.Lock() for _ in range(num_shards)]
+        self._request_counter = 0
+        self._closing = False
+
+        self._connections = []
+        self._processes = []
+        self._readers = []
+        for shard, (indices, vectors) in enumerate(partitions):
+            self.shard_sizes[shard] = len(indices)
+            matrix = np.array(vectors, dtype=np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_shard_worker,
+                args=(child_conn, indices, matrix),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+        del partitions
+
+        for shard in range(num_shards):
+            reader = threading.Thread(target=self._read_replies, args=(shard,),
+                                      name=f"shard-{shard}-reader", daemon=True)
+            reader.start()
+            self._readers.append(reader)
+
+    def _read_replies(self, shard):
+        """Reader thread: hand each reply from a shard to the request waiting for it"""
+        conn = self._connections[shard]
+        while True:
+            try:
+                request_id, result = conn.recv()
+            except (EOFError, OSError):
+                self._mark_down(shard)
+                return
+            with self._lock:
+                self._in_flight[shard] -= 1
+                future = self._pending[shard].pop(request_id, None)
+            # Replies to timed-out requests have no waiter and are dropped
+            if future is not None:
+                future.set_result(result)
+
+    def _mark_down(self, shard):
+        """Stop routing requests to a shard whose worker has gone away"""
+        with self._lock:
+            if self._down[shard]:
+                return
+            self._down[shard] = True
+            waiting = list(self._pending[shard].values())
+            self._pending[shard].clear()
+        for future in waiting:
+            future.set_result(None)
+        if not self._closing:
+            print(f"Shard {shard} worker is down; its results will be missing until the index is rebuilt")
+
+    def _request(self, op, args, timeout):
+        """
+        Send a request to every live shard and collect the replies that arrive in time.
+
+        Args:
+            op (str): Request type handled by the worker
+            args: Request arguments, or a function of the shard number returning them
+            timeout (float): Seconds to wait for replies
+
+        Returns:
+            list: Per-shard results, with None for shards that are down,
+                overloaded, failed or did not answer before the timeout
+        """
+        with self._lock:
+            self._request_counter += 1
+            request_id = self._request_counter
+
+        deadline = time.monotonic() + timeout
+        futures = {}
+        for shard in range(self.num_shards):
+            future = Future()
+            with self._lock:
+                if self._down[shard]:
+                    continue
+                # Requests that timed out are still queued at the worker
+                if self._in_flight[shard] >= self.max_pending:
+                    self.stats["shards_skipped"] += 1
+                    continue
+                self._pending[shard][request_id] = future
+                self._in_flight[shard] += 1
+            try:
+                with self._send_locks[shard]:
+                    shard_args = args(shard) if callable(args) else args
+                    self._connections[shard].send((request_id, op, shard_args))
+            except (EOFError, OSError, ValueError):
+                self._mark_down(shard)
+                continue
+            futures[shard] = future
+
+        wait(list(futures.values()), timeout=max(0.0, deadline - time.monotonic()))
+
+        results = [None] * self.num_shards
+        for shard, future in futures.items():
+            if future.done():
+                results[shard] = future.result()
+            else:
+                with self._lock:
+                    self._pending[shard].pop(request_id, None)
+        return results
+
+    def search(self, query_embedding, top_n, timeout=None):
+        """
+        Find the top matches for a query across all shards.
+
+        Args:
+            query_embedding (list): The query embedding
+            top_n (int): Number of results to return
+            timeout (float, optional): Override the default shard timeout
+
+        Returns:
+            list: List of (similarity_score, document_index) tuples, best first.
+                May be partial if some shards are down or did not answer in time.
+
+        Raises:
+            ShardsUnavailable: If no shard answered
+        """
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        timeout = self.timeout if timeout is None else timeout
+        results = self._request("search", (query_vector, top_n), timeout)
+
+        merged = []
+        missing = 0
+        for shard_results in results:
+            if shard_results is None:
+                missing += 1
+            else:
+                merged.extend(shard_results)
+
+        with self._lock:
+            self.stats["queries"] += 1
+            if missing:
+                self.stats["partial_queries"] += 1
+                self.stats["shard_timeouts"] += missing
+        if missing == self.num_shards:
+            raise ShardsUnavailable(f"No shard answered within {timeout}s")
+        if missing:
+            print(f"Sharded search returned partial results: {missing}/{self.num_shards} shards missing")
+
+        merged.sort(key=lambda item: item[0], reverse=True)
+        return merged[:top_n]
+
+    def sample_pairwise_scores(self, sample_size=256, seed=0, timeout=30.0):
+        """
+        Sample similarities between indexed segments without gathering the matrix.
+
+        A few segment vectors are drawn from the shards in proportion to their
+        size and sent back out as queries; each shard scores them against a
+        random sample of its own segments.
+
+        Args:
+            sample_size (int): Number of segments used as calibration queries
+            seed (int): Random seed for sampling
+            timeout (float): Seconds to wait for each round of shard replies
+
+        Returns:
+            np.ndarray: Flat array of pairwise similarity scores
+        """
+        total = sum(self.shard_sizes)
+        if total == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        def share(shard, count):
+            return int(np.ceil(count * self.shard_sizes[shard] / total))
+
+        samples = self._request("sample", lambda shard: (share(shard, sample_size), seed), timeout)
+        row_indices, row_vectors = [], []
+        for sample in samples:
+            if sample is not None:
+                row_indices.extend(sample[0])
+                row_vectors.extend(sample[1])
+        if not row_indices:
+            return np.zeros(0, dtype=np.float32)
+
+        row_vectors = np.array(row_vectors, dtype=np.float32)
+        scores = self._request(
+            "score",
+            lambda shard: (row_indices, row_vectors, share(shard, sample_size * 16), seed),
+            timeout
+        )
+        parts = [part for part in scores if part is not None and len(part)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    def get_stats(self):
+        """
+        Get shard sizes, health and query counters.
+
+        Returns:
+            dict: Shard statistics
+        """
+        with self._lock:
+            return dict(
+                self.stats,
+                num_shards=self.num_shards,
+                shard_sizes=list(self.shard_sizes),
+                shards_down=[shard for shard, down in enumerate(self._down) if down],
+            )
+
+    def close(self):
+        """Stop all worker processes"""
+        self._closing = True
+        for shard, conn in enumerate(self._connections):
+            try:
+                with self._send_locks[shard]:
+                    conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for process in self._processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._connections:
+            conn.close()
@@ -0,0 +1,3 @@
+"""
+Load-testing tools for the PetroRAG application
+"""
@@ -0,0 +1,225 @@
+"""
+Load generator that replays a query log against the PetroRAG query endpoint
+"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from app.loadtest.report import summarize
+
+
+def load_query_log(path):
+    """
+    Load queries to replay from a log file.
+
+    Plain-text files hold one query per line. JSON Lines files hold one object
+    per line with a "query" field, which is what the API request body uses.
+
+    Args:
+        path (str): Path to the query log
+
+    Returns:
+        list: List of query strings
+    """
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                queries.append(json.loads(line)["query"])
+            else:
+                queries.append(line)
+    if not queries:
+        raise ValueError(f"No queries found in {path}")
+    return queries
+
+
+class LoadGenerator:
+    """Drive an HTTP query endpoint at a fixed concurrency and optional request rate"""
+
+    def __init__(self, url, queries, concurrency=4, rate=None, timeout=60.0):
+        """
+        Initialize the load generator.
+
+        Args:
+            url (str): Full URL of the query endpoint, e.g. http://127.0.0.1:5000/api/query
+            queries (list): Queries to replay, cycled in order
+            concurrency (int): Number of requests allowed in flight at once
+            rate (float, optional): Target requests per second. When omitted the
+                generator runs closed-loop, each worker sending as fast as it can.
+            timeout (float): Per-request client timeout in seconds
+        """
+        self.url = url
+        self.queries = queries
+        self.concurrency = concurrency
+        self.rate = rate
+        self.timeout = timeout
+
+    def _send(self, query):
+        body = json.dumps({"query": query}).encode("utf-8")
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except Exception:
+            # Connection refused, reset or client timeout
+            return None
+
+    def run(self, duration=None, total_requests=None):
+        """
+        Run the load test.
+
+        Args:
+            duration (float, optional): Stop issuing requests after this many seconds.
+                With a request rate, the run sends the requests scheduled in that window.
+            total_requests (int, optional): Stop after this many requests
+
+        Returns:
+            dict: Summary statistics (see ``report.summarize``)
+        """
+        if duration is None and total_requests is None:
+            total_requests = len(self.queries)
+
+        samples = []
+        lock = threading.Lock()
+        counter = [0]
+        start = time.perf_counter()
+
+        def next_index():
+            with lock:
+                i = counter[0]
+                if total_requests is not None and i >= total_requests:
+                    return None
+                if duration is not None and time.perf_counter() - start >= duration:
+                    return None
+                # Idle workers claim slots ahead of their send time, so an
+                # open-loop run must also stop at the end of the schedule
+                if self.rate and duration is not None and i / self.rate >= duration:
+                    return None
+                counter[0] += 1
+                return i
+
+        def worker():
+            while True:
+                i = next_index()
+                if i is None:
+                    return
+                if self.rate:
+                    # Open-loop: measure from the scheduled send time so queueing
+                    # behind a saturated server shows up in the latency.
+                    scheduled = start + i / self.rate
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    t0 = scheduled
+                else:
+                    t0 = time.perf_counter()
+                status = self._send(self.queries[i % len(self.queries)])
+                latency = time.perf_counter() - t0
+                with lock:
+                    samples.append((latency, status))
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        if self.rate:
+            # Rate runs are measured over the schedule, not the time spent
+            # draining the last responses
+            elapsed = duration if duration is not None else float("inf")
+            if total_requests is not None:
+                elapsed = min(elapsed, total_requests / self.rate)
+
+        summary = summarize(samples, elapsed)
+        summary["config"] = {
+            "url": self.url,
+            "concurrency": self.concurrency,
+            "rate": self.rate,
+            "duration": duration,
+            "total_requests": total_requests,
+        }
+        return summary
+
+    def ramp(self, levels, step_duration, step="concurrency", max_error_rate=0.01, p95_slo=None,
+             min_gain=0.05):
+        """
+        Step through increasing load levels to locate the saturation point.
+
+        In closed-loop mode (``step="concurrency"``) each level is a concurrency
+        and saturation is the first level at which throughput grows by less than
+        ``min_gain`` over the previous level. In open-loop mode (``step="rate"``)
+        each level is an offered request rate at the generator's concurrency,
+        and saturation is the first level the server cannot keep up with, i.e.
+        completed requests fall more than ``min_gain`` short of those offered. Either
+        way a level also saturates when the error rate exceeds
+        ``max_error_rate`` or p95 latency exceeds ``p95_slo``.
+
+        Args:
+            levels (list): Concurrency levels or request rates to try, in increasing order
+            step_duration (float): Seconds to run each level
+            step (str): What to step, either "concurrency" or "rate"
+            max_error_rate (float): Highest acceptable error rate
+            p95_slo (float, optional): Highest acceptable p95 latency in seconds
+            min_gain (float): Minimum relative throughput gain per step, or the
+                tolerated shortfall against the offered rate
+
+        Returns:
+            dict: Per-level summaries and the detected saturation point
+        """
+        if step not in ("concurrency", "rate"):
+            raise ValueError(f"Unknown ramp step {step!r}; expected 'concurrency' or 'rate'")
+        if step == "concurrency" and self.rate:
+            # A fixed rate caps throughput, which would read as a plateau
+            raise ValueError("A concurrency ramp must run closed-loop; step the rate instead")
+
+        steps = []
+        saturation = None
+        previous_throughput = None
+        original = (self.concurrency, self.rate)
+
+        try:
+            for level in levels:
+                if step == "rate":
+                    self.rate = level
+                    print(f"Running {level} req/s at concurrency {self.concurrency} for {step_duration}s...")
+                else:
+                    self.concurrency = level
+                    print(f"Running concurrency {level} for {step_duration}s...")
+                summary = self.run(duration=step_duration)
+                steps.append(summary)
+
+                reasons = []
+                if summary["error_rate"] > max_error_rate:
+                    reasons.append("error rate")
+                if p95_slo is not None and summary["latency"]["p95"] > p95_slo:
+                    reasons.append("p95 latency")
+                if step == "rate":
+                    # Workers stuck behind a slow server fall behind the schedule,
+                    # so fewer requests complete than were offered in the step
+                    completed = summary["requests"] - summary["errors"]
+                    if completed < level * step_duration * (1 - min_gain):
+                        reasons.append("throughput below offered rate")
+                elif previous_throughput and summary["throughput"] < previous_throughput * (1 + min_gain):
+                    reasons.append("throughput plateau")
+                previous_throughput = summary["throughput"]
+
+                if reasons:
+                    saturation = {
+                        step: level,
+                        "throughput": summary["throughput"],
+                        "reasons": reasons,
+                    }
+                    break
+        finally:
+            self.concurrency, self.rate = original
+
+        return {"step": step, "steps": steps, "saturation": saturation}
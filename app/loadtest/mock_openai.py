@@ -0,0 +1,198 @@
+"""
+Local stand-in for the OpenAI embeddings and chat completion endpoints.
+
+Serves responses in the same JSON shape as the real API so the unmodified
+OpenAI client can be pointed at it through ``OPENAI_BASE_URL``. Latencies are
+drawn from log-normal distributions, which match the long right tail of the
+hosted service far better than a fixed delay.
+"""
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIMENSIONS = 1536
+
+# Median latency (seconds) and log-normal sigma for each endpoint
+DEFAULT_LATENCY_PROFILE = {
+    "embeddings": {"median": 0.15, "sigma": 0.5},
+    "chat": {"median": 2.0, "sigma": 0.6},
+}
+
+MOCK_ANSWER = "I don't Know."
+
+
+def fake_embedding(text, dimensions=EMBEDDING_DIMENSIONS):
+    """
+    Build a deterministic unit-length embedding for a text.
+
+    Args:
+        text (str): The text to embed
+        dimensions (int): Length of the embedding vector
+
+    Returns:
+        list: The embedding vector
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class MockOpenAIServer:
+    """Threaded HTTP server that imitates the OpenAI REST API"""
+
+    def __init__(self, host="127.0.0.1", port=8001, latency_profile=None,
+                 latency_scale=1.0, error_rate=0.0):
+        """
+        Initialize the mock server.
+
+        Args:
+            host (str): Interface to bind to
+            port (int): Port to listen on
+            latency_profile (dict, optional): Per-endpoint median/sigma overrides
+            latency_scale (float): Multiplier applied to every sampled latency
+            error_rate (float): Fraction of requests answered with HTTP 500
+        """
+        self.host = host
+        self.port = port
+        self.latency_profile = dict(DEFAULT_LATENCY_PROFILE)
+        if latency_profile:
+            self.latency_profile.update(latency_profile)
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self.request_counts = {"embeddings": 0, "chat": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """Base URL to use as ``OPENAI_BASE_URL``"""
+        return f"http://{self.host}:{self.port}/v1"
+
+    def sample_latency(self, endpoint):
+        """
+        Sample a latency for an endpoint from its log-normal distribution.
+
+        Args:
+            endpoint (str): Either "embeddings" or "chat"
+
+        Returns:
+            float: Latency in seconds
+        """
+        profile = self.latency_profile[endpoint]
+        return random.lognormvariate(math.log(profile["median"]), profile["sigma"]) * self.latency_scale
+
+    def _count(self, key):
+        with self._lock:
+            self.request_counts[key] += 1
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                # Keep the console quiet under load
+                pass
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    data = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+                    return
+
+                if self.path.endswith("/embeddings"):
+                    endpoint = "embeddings"
+                elif self.path.endswith("/chat/completions"):
+                    endpoint = "chat"
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+
+                server._count(endpoint)
+                time.sleep(server.sample_latency(endpoint))
+
+                if random.random() < server.error_rate:
+                    server._count("errors")
+                    self._send_json(500, {"error": {"message": "Injected mock failure", "type": "server_error"}})
+                    return
+
+                if endpoint == "embeddings":
+                    self._send_json(200, server._embeddings_response(data))
+                else:
+                    self._send_json(200, server._chat_response(data))
+
+        return Handler
+
+    def _embeddings_response(self, data):
+        inputs = data.get("input", "")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        tokens = sum(len(str(text)) // 4 for text in inputs)
+        return {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(str(text))}
+                for i, text in enumerate(inputs)
+            ],
+            "model": data.get("model", "mock-embedding"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _chat_response(self, data):
+        prompt_tokens = sum(len(str(m.get("content", ""))) // 4 for m in data.get("messages", []))
+        completion_tokens = len(MOCK_ANSWER) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": data.get("model", "mock-chat"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": MOCK_ANSWER},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def start(self):
+        """Start serving in a background thread"""
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._httpd.daemon_threads = True
+        # Pick up the real port when binding to port 0
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def serve_forever(self):
+        """Serve in the current thread until interrupted"""
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._httpd.serve_forever()
+
+    def stop(self):
+        """Stop the server"""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
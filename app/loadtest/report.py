@@ -0,0 +1,235 @@
+"""
+Summaries, histograms and run-to-run comparison for load-test results
+"""
+import bisect
+import json
+import math
+
+# Fixed latency bucket upper bounds, log-spaced by sqrt(2) from 1ms to ~131s.
+# Every run uses the same edges so histograms from different runs line up.
+HISTOGRAM_BOUNDS = [0.001 * 2 ** (i / 2) for i in range(35)]
+
+# Metrics shown by ``compare_results``, as (label, path into the summary)
+COMPARED_METRICS = [
+    ("throughput (req/s)", ("throughput",)),
+    ("error rate", ("error_rate",)),
+    ("p50 (s)", ("latency", "p50")),
+    ("p95 (s)", ("latency", "p95")),
+    ("p99 (s)", ("latency", "p99")),
+    ("max (s)", ("latency", "max")),
+]
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values (list): Values in ascending order
+        pct (float): Percentile between 0 and 100
+
+    Returns:
+        float: The percentile value, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def build_histogram(latencies):
+    """
+    Bucket latencies into the fixed log-spaced bins of ``HISTOGRAM_BOUNDS``.
+
+    Args:
+        latencies (list): Latencies in seconds
+
+    Returns:
+        list: List of [upper_bound_seconds, count] pairs, one per bound, plus a
+            final [None, count] overflow bucket
+    """
+    counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+    for value in latencies:
+        counts[bisect.bisect_left(HISTOGRAM_BOUNDS, value)] += 1
+    return [[bound, count] for bound, count in zip(HISTOGRAM_BOUNDS + [None], counts)]
+
+
+def _bucket_label(bound):
+    return "      +inf" if bound is None else f"{bound:9.4f}s"
+
+
+def _occupied_range(*histograms):
+    """Index range spanning the non-empty buckets of one or more histograms"""
+    occupied = [i for histogram in histograms for i, (_, count) in enumerate(histogram) if count]
+    if not occupied:
+        return range(0)
+    return range(min(occupied), max(occupied) + 1)
+
+
+def summarize(samples, elapsed):
+    """
+    Summarize raw load-test samples.
+
+    Args:
+        samples (list): List of (latency_seconds, http_status) tuples. A status of
+            None means the request never got an HTTP response.
+        elapsed (float): Wall-clock duration of the run in seconds
+
+    Returns:
+        dict: Request counts, throughput, error rate, latency percentiles and histogram
+    """
+    ok = sorted(latency for latency, status in samples if status is not None and status < 400)
+    errors = len(samples) - len(ok)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "elapsed": elapsed,
+        "throughput": len(ok) / elapsed if elapsed > 0 else 0.0,
+        "latency": {
+            "p50": percentile(ok, 50),
+            "p95": percentile(ok, 95),
+            "p99": percentile(ok, 99),
+            "max": ok[-1] if ok else 0.0,
+            "mean": sum(ok) / len(ok) if ok else 0.0,
+        },
+        "histogram": build_histogram(ok),
+    }
+
+
+def format_summary(summary):
+    """
+    Render a summary as human-readable text.
+
+    Args:
+        summary (dict): Output of ``summarize``
+
+    Returns:
+        str: Formatted report
+    """
+    latency = summary["latency"]
+    lines = [
+        f"Requests:   {summary['requests']} ({summary['errors']} errors, {summary['error_rate']:.2%})",
+        f"Elapsed:    {summary['elapsed']:.2f}s",
+        f"Throughput: {summary['throughput']:.2f} req/s",
+        f"Latency:    p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  "
+        f"p99 {latency['p99']:.3f}s  max {latency['max']:.3f}s",
+    ]
+    histogram = summary.get("histogram") or []
+    buckets = _occupied_range(histogram)
+    if buckets:
+        lines.append("Histogram:")
+        peak = max(count for _, count in histogram)
+        for i in buckets:
+            bound, count = histogram[i]
+            bar = "#" * int(round(40 * count / peak))
+            lines.append(f"  <= {_bucket_label(bound)} {count:6d} {bar}")
+    return "\n".join(lines)
+
+
+def format_ramp(result):
+    """
+    Render a ramp result as human-readable text.
+
+    Args:
+        result (dict): Output of ``LoadGenerator.ramp``
+
+    Returns:
+        str: Formatted report
+    """
+    step = result.get("step", "concurrency")
+    header = "concurrency" if step == "concurrency" else "rate (req/s)"
+    lines = [f"{header:>12}  throughput  error rate      p50      p95      p99"]
+    for summary in result["steps"]:
+        latency = summary["latency"]
+        lines.append(
+            f"{summary['config'][step]:>12}  {summary['throughput']:>10.2f}  {summary['error_rate']:>10.2%}"
+            f"  {latency['p50']:>7.3f}  {latency['p95']:>7.3f}  {latency['p99']:>7.3f}"
+        )
+    saturation = result.get("saturation")
+    if saturation:
+        level = f"concurrency {saturation[step]}" if step == "concurrency" else f"{saturation[step]} req/s"
+        lines.append(
+            f"Saturation at {level} "
+            f"({saturation['throughput']:.2f} req/s): {', '.join(saturation['reasons'])}"
+        )
+    else:
+        lines.append("No saturation point reached")
+    return "\n".join(lines)
+
+
+def save_results(results, file_path):
+    """
+    Save results to a JSON file for later comparison.
+
+    Args:
+        results (dict): Run summary or ramp result
+        file_path (str): Path to write
+    """
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(file_path):
+    """
+    Load results saved by ``save_results``.
+
+    Args:
+        file_path (str): Path to read
+
+    Returns:
+        dict: The saved results
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _lookup(summary, path):
+    value = summary
+    for key in path:
+        value = value[key]
+    return value
+
+
+def compare_results(baseline, candidate):
+    """
+    Compare two run summaries metric by metric and bucket by bucket.
+
+    Ramp results are compared on their last (highest-load) step. Histogram
+    buckets are compared as shares of each run's successful requests, since
+    the runs may differ in length.
+
+    Args:
+        baseline (dict): Summary of the reference run
+        candidate (dict): Summary of the new run
+
+    Returns:
+        str: Formatted comparison table
+    """
+    if "steps" in baseline:
+        baseline = baseline["steps"][-1]
+    if "steps" in candidate:
+        candidate = candidate["steps"][-1]
+
+    lines = [f"{'metric':<20}{'baseline':>12}{'candidate':>12}{'change':>10}"]
+    for label, path in COMPARED_METRICS:
+        before = _lookup(baseline, path)
+        after = _lookup(candidate, path)
+        change = f"{(after - before) / before:+.1%}" if before else "n/a"
+        lines.append(f"{label:<20}{before:>12.4f}{after:>12.4f}{change:>10}")
+
+    before_histogram = baseline.get("histogram") or []
+    after_histogram = candidate.get("histogram") or []
+    if len(before_histogram) == len(after_histogram) and _occupied_range(before_histogram, after_histogram):
+        before_total = sum(count for _, count in before_histogram) or 1
+        after_total = sum(count for _, count in after_histogram) or 1
+        lines.append("")
+        lines.append(f"{'latency bucket':<20}{'baseline':>12}{'candidate':>12}{'change':>10}")
+        for i in _occupied_range(before_histogram, after_histogram):
+            before = before_histogram[i][1] / before_total
+            after = after_histogram[i][1] / after_total
+            lines.append(
+                f"{'<= ' + _bucket_label(before_histogram[i][0]).strip():<20}"
+                f"{before:>12.1%}{after:>12.1%}{(after - before) * 100:>+9.1f}pp"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,257 @@
+"""
+In-process sampling profiler for individual requests.
+
+Request threads register themselves while they are being profiled, and a
+single background thread periodically captures their Python stacks through
+``sys._current_frames()``. Work a request hands to a thread pool (such as the
+OpenAI calls made through ``ResilientCaller``) is sampled into the same profile
+when the submitted function is wrapped with ``inherit_profile``; those stacks are
+prefixed with the worker thread's name. Stacks are stored in collapsed form
+("outer;inner;leaf count"), which flamegraph.pl and speedscope read directly.
+The sampler thread only runs while at least one request is being profiled, so
+unprofiled requests pay nothing beyond the decision to skip them.
+"""
+import contextvars
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+MAX_STACK_DEPTH = 128
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (profiler, profile) of the request being profiled in the current thread
+_current_profile = contextvars.ContextVar("request_profile", default=None)
+
+
+def _frame_label(frame):
+    """Label for one stack frame: function name and where it is defined"""
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    # Semicolons separate frames in the collapsed format
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def collapse_stack(frame):
+    """
+    Convert a frame and its callers into a collapsed stack string.
+
+    Args:
+        frame: The innermost frame
+
+    Returns:
+        str: Frames from outermost to innermost, separated by semicolons
+    """
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def format_collapsed(stacks):
+    """
+    Render stack counts in collapsed-stack format.
+
+    Args:
+        stacks (Counter): Mapping of collapsed stack to sample count
+
+    Returns:
+        str: One "stack count" line per stack, most frequent first
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def inherit_profile(fn):
+    """
+    Wrap a function about to be handed to a worker thread so the thread is
+    sampled into the calling request's profile while it runs the function.
+
+    Args:
+        fn (callable): The function to run in the worker thread
+
+    Returns:
+        callable: ``fn`` itself when the calling thread is not being profiled
+    """
+    owner = _current_profile.get()
+    if owner is None:
+        return fn
+    profiler, profile = owner
+
+    def run(*args, **kwargs):
+        profiler._adopt(profile)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler._release(profile)
+
+    return run
+
+
+class SamplingProfiler:
+    """Periodically sample the stacks of registered request threads"""
+
+    def __init__(self, interval=0.005, max_recent=50):
+        """
+        Initialize the profiler.
+
+        Args:
+            interval (float): Seconds between samples
+            max_recent (int): Number of individual request profiles to keep
+        """
+        self.interval = interval
+        self.aggregate = Counter()
+        self.recent = deque(maxlen=max_recent)
+        self.profiled_requests = 0
+        self._active = {}
+        self._workers = {}
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def start(self, label=""):
+        """
+        Start profiling the calling thread.
+
+        Args:
+            label (str, optional): Description stored with the profile, e.g. the request path
+
+        Returns:
+            str: Profile identifier to pass to ``stop``
+        """
+        profile_id = uuid.uuid4().hex[:12]
+        profile = {
+            "id": profile_id,
+            "label": label,
+            "started": time.time(),
+            "stacks": Counter(),
+        }
+        _current_profile.set((self, profile))
+        with self._lock:
+            self._active[threading.get_ident()] = profile
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._sampler.start()
+        return profile_id
+
+    def stop(self):
+        """
+        Stop profiling the calling thread and record its profile.
+
+        Returns:
+            dict: Summary of the finished profile, or None if the thread was not being profiled
+        """
+        with self._lock:
+            profile = self._active.pop(threading.get_ident(), None)
+            if profile is None:
+                return None
+            # Workers still busy for this request stop counting towards it
+            for thread_id, (worker_profile, _) in list(self._workers.items()):
+                if worker_profile is profile:
+                    del self._workers[thread_id]
+            profile["duration"] = time.time() - profile["started"]
+            self.aggregate.update(profile["stacks"])
+            self.recent.append(profile)
+            self.profiled_requests += 1
+        _current_profile.set(None)
+        return self._summary(profile)
+
+    def _adopt(self, profile):
+        """Sample the calling worker thread into a request's profile"""
+        thread = threading.current_thread()
+        with self._lock:
+            if any(active is profile for active in self._active.values()):
+                self._workers[thread.ident] = (profile, f"[{thread.name}]".replace(";", ":"))
+
+    def _release(self, profile):
+        """Stop sampling the calling worker thread for a request"""
+        with self._lock:
+            entry = self._workers.get(threading.get_ident())
+            if entry is not None and entry[0] is profile:
+                del self._workers[threading.get_ident()]
+
+    def _run(self):
+        """Sampler loop; exits once no thread is being profiled"""
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+                for thread_id, profile in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile["stacks"][collapse_stack(frame)] += 1
+                for thread_id, (profile, prefix) in self._workers.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile["stacks"][f"{prefix};{collapse_stack(frame)}"] += 1
+            del frames
+
+    @staticmethod
+    def _summary(profile):
+        return {
+            "id": profile["id"],
+            "label": profile["label"],
+            "started": profile["started"],
+            "duration": profile.get("duration"),
+            "samples": sum(profile["stacks"].values()),
+        }
+
+    def collapsed(self, profile_id=None):
+        """
+        Get profiled stacks in collapsed-stack format.
+
+        Args:
+            profile_id (str, optional): A single recent request profile; all profiles
+                aggregated when omitted
+
+        Returns:
+            str: Collapsed stacks, or None if the profile is unknown
+        """
+        with self._lock:
+            if profile_id is None:
+                return format_collapsed(self.aggregate)
+            for profile in self.recent:
+                if profile["id"] == profile_id:
+                    return format_collapsed(profile["stacks"])
+        return None
+
+    def list_recent(self):
+        """
+        List the most recent request profiles, newest first.
+
+        Returns:
+            list: Profile summaries
+        """
+        with self._lock:
+            return [self._summary(profile) for profile in reversed(self.recent)]
+
+    def reset(self):
+        """Discard all recorded profiles"""
+        with self._lock:
+            self.aggregate.clear()
+            self.recent.clear()
+            self.profiled_requests = 0
+
+    def get_stats(self):
+        """
+        Get profiler counters.
+
+        Returns:
+            dict: Profiled request count, total samples and distinct stacks
+        """
+        with self._lock:
+            return {
+                "profiled_requests": self.profiled_requests,
+                "samples": sum(self.aggregate.values()),
+                "unique_stacks": len(self.aggregate),
+                "active": len(self._active),
+            }
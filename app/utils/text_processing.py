@@ -39,6 +39,18 @@ def clean_text(text):
     """
     return text.replace("\n", " ").strip()
 
+def normalize_chunk_text(text):
+    """
+    Normalize chunk text so that whitespace-only differences compare equal.
+    
+    Args:
+        text (str): The chunk text
+        
+    Returns:
+        str: The text with all runs of whitespace collapsed to single spaces
+    """
+    return " ".join(str(text).split())
+
 def vector_similarity(x, y):
     """
     Calculate the dot product between two vectors.
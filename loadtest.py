@@ -0,0 +1,109 @@
+"""
+Command-line entry point for load-testing PetroRAG
+
+Usage:
+    python loadtest.py mock --port 8001
+    python loadtest.py run --queries queries.txt --concurrency 8 --duration 60 --output run.json
+    python loadtest.py ramp --queries queries.txt --levels 1,2,4,8,16 --step-duration 30
+    python loadtest.py ramp --queries queries.txt --step rate --levels 1,2,5,10 --step-duration 30
+    python loadtest.py compare baseline.json run.json
+"""
+import argparse
+import sys
+
+from app.loadtest.generator import LoadGenerator, load_query_log
+from app.loadtest.mock_openai import MockOpenAIServer
+from app.loadtest.report import (
+    compare_results, format_ramp, format_summary, load_results, save_results
+)
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(description="Load-test the PetroRAG query API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    mock = subparsers.add_parser("mock", help="Serve a local stand-in for the OpenAI API")
+    mock.add_argument("--host", default="127.0.0.1")
+    mock.add_argument("--port", type=int, default=8001)
+    mock.add_argument("--latency-scale", type=float, default=1.0,
+                      help="Multiply every sampled latency by this factor")
+    mock.add_argument("--error-rate", type=float, default=0.0,
+                      help="Fraction of mock requests that fail with HTTP 500")
+
+    for name, help_text in (("run", "Run a single load test"),
+                            ("ramp", "Step up concurrency or request rate to find the saturation point")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--url", default="http://127.0.0.1:5000/api/query")
+        sub.add_argument("--queries", required=True,
+                         help="Query log: one query per line, or JSON Lines with a 'query' field")
+        sub.add_argument("--timeout", type=float, default=60.0)
+        sub.add_argument("--output", help="Write results as JSON for later comparison")
+
+    run = subparsers.choices["run"]
+    run.add_argument("--concurrency", type=int, default=4)
+    run.add_argument("--rate", type=float, default=None,
+                     help="Target requests per second (default: closed-loop)")
+    run.add_argument("--duration", type=float, default=None)
+    run.add_argument("--requests", type=int, default=None)
+
+    ramp = subparsers.choices["ramp"]
+    ramp.add_argument("--step", choices=["concurrency", "rate"], default="concurrency",
+                      help="Step closed-loop concurrency, or the open-loop request rate")
+    ramp.add_argument("--levels", default="1,2,4,8,16,32",
+                      help="Comma-separated concurrency levels or request rates")
+    ramp.add_argument("--concurrency", type=int, default=64,
+                      help="Requests allowed in flight when stepping the rate")
+    ramp.add_argument("--step-duration", type=float, default=30.0)
+    ramp.add_argument("--max-error-rate", type=float, default=0.01)
+    ramp.add_argument("--p95-slo", type=float, default=None)
+
+    compare = subparsers.add_parser("compare", help="Compare two saved runs")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the requested load-testing command"""
+    args = parse_args(argv)
+
+    if args.command == "mock":
+        server = MockOpenAIServer(args.host, args.port,
+                                  latency_scale=args.latency_scale, error_rate=args.error_rate)
+        print(f"Mock OpenAI API listening on {server.base_url}")
+        print(f"Start the app with OPENAI_BASE_URL={server.base_url} to use it")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.command == "compare":
+        print(compare_results(load_results(args.baseline), load_results(args.candidate)))
+        return 0
+
+    queries = load_query_log(args.queries)
+
+    if args.command == "run":
+        generator = LoadGenerator(args.url, queries, concurrency=args.concurrency,
+                                  rate=args.rate, timeout=args.timeout)
+        results = generator.run(duration=args.duration, total_requests=args.requests)
+        print(format_summary(results))
+    else:
+        generator = LoadGenerator(args.url, queries, concurrency=args.concurrency, timeout=args.timeout)
+        parse_level = int if args.step == "concurrency" else float
+        levels = [parse_level(level) for level in args.levels.split(",")]
+        results = generator.ramp(levels, args.step_duration, step=args.step,
+                                 max_error_rate=args.max_error_rate, p95_slo=args.p95_slo)
+        print(format_ramp(results))
+
+    if args.output:
+        save_results(results, args.output)
+        print(f"Results saved to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())